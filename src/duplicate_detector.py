@@ -1,68 +1,266 @@
 """
 Duplicate file detector module.
-Handles file size comparison and MD5 hashing for duplicate detection.
+Handles file size comparison and content hashing for duplicate detection.
 """
 
 import os
+import stat
+import sys
 import hashlib
-from typing import Dict, List, Set, Optional, Callable
+import mmap
+import multiprocessing
+from typing import Dict, Iterator, List, Set, Optional, Callable, Tuple
 from pathlib import Path
 import threading
 import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from .file_manager import can_share_extents, physical_extents
+from .folder_watcher import FolderWatcher
+from .hash_cache import HashCache
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+
+# Number of leading and trailing bytes compared before escalating to a full hash
+SAMPLE_SIZE = 4096
+
+# Read size used while hashing; large reads amortize per-call overhead
+READ_CHUNK_SIZE = 1 << 20
+
+# In worker processes, files needing more than one read are memory-mapped and hashed in a single call
+MMAP_THRESHOLD = READ_CHUNK_SIZE
+
+# Largest file mapped at once; 32-bit builds lack the address space for big mappings
+MMAP_MAX_SIZE = sys.maxsize if sys.maxsize > 2 ** 32 else 256 << 20
+
+# Small files are sent to hashing workers in batches to amortize dispatch cost
+HASH_BATCH_FILES = 32
+HASH_BATCH_BYTES = 8 << 20
+
+# Minimum number of seconds between per-file progress updates
+PROGRESS_INTERVAL = 0.1
+
+# Content hash in use: the fast non-cryptographic xxh3 or the SIMD-accelerated
+# BLAKE3 when installed, 128-bit BLAKE2b from the standard library otherwise
+# (faster than MD5 on 64-bit CPUs). The name also tags cached hashes.
+if xxhash is not None:
+    CONTENT_HASH_NAME = "xxh3_128"
+elif blake3 is not None:
+    CONTENT_HASH_NAME = "blake3"
+else:
+    CONTENT_HASH_NAME = "blake2b_128"
+
+
+def new_content_hasher():
+    """
+    Create a hash object for file content comparison.
+    
+    Returns:
+        Hash object for CONTENT_HASH_NAME exposing update() and hexdigest()
+    """
+    if CONTENT_HASH_NAME == "xxh3_128":
+        return xxhash.xxh3_128()
+    if CONTENT_HASH_NAME == "blake3":
+        return blake3.blake3()
+    return hashlib.blake2b(digest_size=16)
+
+
+def advise_sequential(fd: int):
+    """
+    Hint the kernel that a file will be read sequentially from start to end.
+    
+    Enables aggressive readahead where posix_fadvise is available, and marks
+    the pages as used once so a large scan does not push other programs' data
+    out of the page cache first. Caching is not disabled outright, since files
+    with matching hashes are read again by the byte comparison. These are
+    only hints, so failures are ignored.
+    
+    Args:
+        fd: Open file descriptor
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_NOREUSE)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+
+
+def read_full(f, buffer: bytearray) -> int:
+    """
+    Fill a buffer from an unbuffered file, retrying short reads.
+    
+    Raw reads may return fewer bytes than requested before the end of the
+    file (FUSE direct I/O, some network filesystems).
+    
+    Args:
+        f: File opened with buffering=0
+        buffer: Buffer to fill
+        
+    Returns:
+        Number of bytes read; less than len(buffer) only at end of file
+    """
+    view = memoryview(buffer)
+    filled = 0
+    while filled < len(buffer):
+        read_size = f.readinto(view[filled:])
+        if not read_size:
+            break
+        filled += read_size
+    return filled
+
+
+def hash_file(file_path: str, use_mmap: bool = True) -> Optional[str]:
+    """
+    Hash the content of a file.
+    
+    Defined at module level so it can be dispatched to worker processes.
+    
+    Args:
+        file_path: Path to the file
+        use_mmap: Map large files instead of reading them. A file truncated
+            while mapped raises SIGBUS, which kills the process, so only
+            worker processes should map files.
+        
+    Returns:
+        Hash string or None if file cannot be read
+    """
+    try:
+        hasher = new_content_hasher()
+        # Unbuffered: reads are already large, so skip the extra copy
+        with open(file_path, "rb", buffering=0) as f:
+            advise_sequential(f.fileno())
+            file_size = os.fstat(f.fileno()).st_size
+            if use_mmap and MMAP_THRESHOLD < file_size <= MMAP_MAX_SIZE:
+                try:
+                    # The mapping is released on exit rather than left to the garbage collector
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                            mm.madvise(mmap.MADV_SEQUENTIAL)
+                        hasher.update(mm)
+                    return hasher.hexdigest()
+                except (OverflowError, ValueError, mmap.error):
+                    # Could not map the file; read it in chunks instead
+                    hasher = new_content_hasher()
+            
+            # Read into one reused buffer instead of allocating per chunk
+            buffer = bytearray(max(1, min(file_size, READ_CHUNK_SIZE)))
+            view = memoryview(buffer)
+            while True:
+                read_size = f.readinto(buffer)
+                if not read_size:
+                    break
+                hasher.update(view[:read_size])
+        return hasher.hexdigest()
+    except (IOError, OSError, PermissionError):
+        # File is inaccessible or in use
+        return None
+
+
+def hash_file_batch(file_paths: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """
+    Hash several files in one worker call.
+    
+    Args:
+        file_paths: List of file paths to hash
+        
+    Returns:
+        List of (file path, hash string or None) tuples
+    """
+    return [(file_path, hash_file(file_path)) for file_path in file_paths]
 
 
 class DuplicateDetector:
     """
-    Detects duplicate files using file size comparison and MD5 hashing.
+    Detects duplicate files using file size comparison and content hashing.
     """
     
-    def __init__(self, progress_callback: Optional[Callable] = None):
+    # Every empty file has the same content, so its hash is computed only once
+    _EMPTY_HASH = new_content_hasher().hexdigest()
+    
+    def __init__(self, progress_callback: Optional[Callable] = None, max_workers: Optional[int] = None,
+                 hash_cache: Optional[HashCache] = None, folder_watcher: Optional[FolderWatcher] = None):
         self.progress_callback = progress_callback
-        self.stop_search = False
+        self.max_workers = max_workers  # Hashing processes; None uses all cores, 1 hashes in-process
+        self.hash_cache = hash_cache  # Hashes from earlier searches; None disables caching
+        self.folder_watcher = folder_watcher  # Tracks changes after a scan; None disables quick rescans
+        self.verify_contents = True  # Compare files sharing a hash byte by byte; False trusts the hash
+        self.cancel_event = threading.Event()  # Set to stop the running search
         self.current_operation = ""
+        self._last_progress_time = 0.0
+        self._normalized_paths = {}  # Cache of resolved paths, cleared after each search
+        self._file_stats = {}  # file_path -> os.stat_result of bucketed files from the latest scan
+        self._shared_storage = {}  # file_path -> hashed file whose bytes on disk it shares
+        self.normalized_root = None  # Resolved root of the latest search
+        self._listing = None  # file_path -> os.stat_result of every file, kept while the root is watched
         
     def _normalize_path(self, file_path: str) -> str:
         """
         Normalize file path for the current operating system.
         
+        Results are cached because resolving a path costs several syscalls.
+        
         Args:
             file_path: Path to normalize
             
         Returns:
             Normalized path string
         """
+        normalized = self._normalized_paths.get(file_path)
+        if normalized is not None:
+            return normalized
+        
         # Convert to Path object and resolve
         path = Path(file_path)
         try:
             # Resolve path to absolute path and normalize separators
-            normalized = path.resolve()
-            return str(normalized)
+            normalized = str(path.resolve())
         except (OSError, ValueError):
             # If resolve fails, try basic normalization
-            return os.path.normpath(os.path.abspath(file_path))
+            normalized = os.path.normpath(os.path.abspath(file_path))
+        
+        self._normalized_paths[file_path] = normalized
+        return normalized
+        
+    def _progress_due(self) -> bool:
+        """
+        Check whether enough time has passed to send another progress update.
         
-    def calculate_md5(self, file_path: str) -> Optional[str]:
+        Per-file updates are rate limited so large scans do not flood the UI.
+        
+        Returns:
+            True if a progress update should be sent now
+        """
+        now = time.monotonic()
+        if now - self._last_progress_time < PROGRESS_INTERVAL:
+            return False
+        self._last_progress_time = now
+        return True
+        
+    def calculate_content_hash(self, file_path: str) -> Optional[str]:
         """
-        Calculate MD5 hash of a file.
+        Calculate the content hash of a file.
         
         Args:
             file_path: Path to the file
             
         Returns:
-            MD5 hash string or None if file cannot be read
+            Hash string or None if file cannot be read
         """
-        try:
-            # Normalize path first
-            normalized_path = self._normalize_path(file_path)
-            
-            hash_md5 = hashlib.md5()
-            with open(normalized_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except (IOError, OSError, PermissionError):
-            # File is inaccessible or in use
-            return None
+        return hash_file(file_path, use_mmap=False)
     
     def get_file_size(self, file_path: str) -> Optional[int]:
         """
@@ -75,9 +273,7 @@ class DuplicateDetector:
             File size in bytes or None if file cannot be accessed
         """
         try:
-            # Normalize path first
-            normalized_path = self._normalize_path(file_path)
-            return os.path.getsize(normalized_path)
+            return os.path.getsize(file_path)
         except (IOError, OSError, PermissionError):
             return None
     
@@ -93,163 +289,671 @@ class DuplicateDetector:
         """
         return os.path.basename(file_path).startswith('.')
     
-    def get_all_files(self, root_dir: str) -> List[str]:
+    def get_file_stat(self, file_path: str) -> Optional[os.stat_result]:
+        """
+        Get the stat info recorded for a file during the current search.
+        
+        Only files that shared their size with another file are recorded, which
+        covers every file in a duplicate group. The records are dropped once
+        the search finishes.
+        
+        Args:
+            file_path: Path as yielded by the search
+            
+        Returns:
+            Stat info from the directory scan, or None if not recorded
+        """
+        return self._file_stats.get(file_path)
+    
+    def read_sample(self, file_path: str, file_size: int) -> Optional[bytes]:
+        """
+        Read the first and last bytes of a file.
+        
+        The head and tail blocks never overlap, so for files of up to
+        2 * SAMPLE_SIZE bytes the sample is the entire content.
+        
+        Args:
+            file_path: Path to the file
+            file_size: Size of the file in bytes
+            
+        Returns:
+            Up to SAMPLE_SIZE leading bytes followed by up to SAMPLE_SIZE
+            trailing bytes, or None if file cannot be read
+        """
+        if file_size == 0:
+            return b""
+        
+        try:
+            with open(file_path, "rb") as f:
+                tail_offset = max(SAMPLE_SIZE, file_size - SAMPLE_SIZE)
+                if file_size > 2 * SAMPLE_SIZE and hasattr(os, "posix_fadvise"):
+                    # Start fetching the tail while the head is being read
+                    try:
+                        os.posix_fadvise(f.fileno(), tail_offset, SAMPLE_SIZE, os.POSIX_FADV_WILLNEED)
+                    except OSError:
+                        pass
+                
+                sample = f.read(SAMPLE_SIZE)
+                if file_size > SAMPLE_SIZE:
+                    f.seek(tail_offset)
+                    sample += f.read(SAMPLE_SIZE)
+                return sample
+        except (IOError, OSError, PermissionError):
+            return None
+    
+    def enumerate_and_bucket(self, root_dir: str, quick: bool = False) -> Dict[Tuple[int, bytes], List[str]]:
         """
-        Recursively get all files in a directory, excluding hidden files.
+        Recursively collect files and bucket them by size and sampled bytes.
+        
+        Discovery, size grouping and head/tail comparison happen in a single
+        pass over the tree. File type and size come from os.scandir entries,
+        and samples are only read once a second file of the same size shows
+        up, so files with a unique size are never opened. Hidden files are
+        excluded.
+        
+        With a folder watcher, the first quick scan of a root walks the whole
+        tree, starts watching it and keeps the file listing. Later quick scans
+        reuse the listing and only revisit the paths reported as changed
+        since; they walk the whole tree again if the watch was interrupted.
         
         Args:
             root_dir: Root directory to search
+            quick: Reuse the listing of the previous scan of the same root
             
         Returns:
-            List of file paths
+            Dictionary mapping (size, sample) to list of files sharing both
         """
-        files = []
-        total_dirs = 0
+        size_first = {}  # size -> first file seen with that size
+        sample_buckets = defaultdict(list)
+        link_samples = {}  # (st_dev, st_ino) -> sample of a file with several hard links
+        scanned_files = 0
+        sampled_files = 0
+        known_dirs = 1
         processed_dirs = 0
+        last_progress = 0
         
-        # Normalize root directory first
+        # Normalize root directory once; child paths are joined from it
         normalized_root = self._normalize_path(root_dir)
+        self.normalized_root = normalized_root
         
-        # Count total directories for progress
-        for root, dirs, _ in os.walk(normalized_root):
-            total_dirs += 1
-        
-        for root, dirs, filenames in os.walk(normalized_root):
-            if self.stop_search:
-                break
+        def scan(root):
+            nonlocal known_dirs, processed_dirs, last_progress
+            
+            # Depth-first walk with an explicit stack: deep trees cannot hit the
+            # recursion limit, and files are not passed up through one generator
+            # per directory level
+            pending_dirs = deque([root])
+            while pending_dirs:
+                if self.cancel_event.is_set():
+                    return
+                
+                directory = pending_dirs.pop()
+                processed_dirs += 1
+                
+                # Update progress, estimated from the directories discovered so far
+                if self.progress_callback and self._progress_due():
+                    last_progress = max(last_progress, ((processed_dirs - 1) / known_dirs) * 60)  # 60% for file discovery
+                    self.progress_callback(last_progress, f"Scanning directory: {directory}")
+                
+                try:
+                    entries = list(os.scandir(directory))
+                except OSError:
+                    # Directory is inaccessible
+                    continue
                 
-            processed_dirs += 1
+                subdirs = []
+                for entry in entries:
+                    if self.cancel_event.is_set():
+                        return
+                    
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            # Skip hidden files
+                            if self.is_hidden_file(entry.name):
+                                continue
+                            yield entry.path, entry.stat(follow_symlinks=False)
+                    except OSError:
+                        # Skip if file is not accessible
+                        continue
+                
+                # Reversed so subdirectories are still visited in scandir order
+                known_dirs += len(subdirs)
+                pending_dirs.extend(reversed(subdirs))
+        
+        def add_to_bucket(file_path, stat_info):
+            nonlocal sampled_files
+            sampled_files += 1
             
-            # Update progress
-            if self.progress_callback:
-                progress = (processed_dirs / total_dirs) * 30  # 30% for file discovery
-                self.progress_callback(progress, f"Scanning directory: {root}")
+            # Hard links share their content, so each inode's sample is read once
+            inode = None
+            if stat_info.st_ino and stat_info.st_nlink > 1:
+                inode = (stat_info.st_dev, stat_info.st_ino)
+            sample = link_samples.get(inode) if inode else None
+            if sample is None:
+                sample = self.read_sample(file_path, stat_info.st_size)
+                if inode and sample is not None:
+                    link_samples[inode] = sample
             
-            for filename in filenames:
-                if self.stop_search:
-                    break
-                    
-                file_path = os.path.join(root, filename)
+            if sample is not None:
+                sample_buckets[(stat_info.st_size, sample)].append(file_path)
+                self._file_stats[file_path] = stat_info
+        
+        def rescan(changed_paths):
+            nonlocal known_dirs
+            listing = self._listing
+            
+            # Forget changed files, then look at them again
+            changed_dirs = set()  # Changed paths that were not listed files, e.g. directories
+            for path in changed_paths:
+                if listing.pop(path, None) is None:
+                    changed_dirs.add(path)
+            
+            # Forget files below a changed directory. Whether a directory lies
+            # under one is decided once per directory, not once per file.
+            if changed_dirs:
+                stale_dirs = {normalized_root: normalized_root in changed_dirs}
                 
-                # Normalize the file path
-                normalized_file_path = self._normalize_path(file_path)
+                def is_stale(directory):
+                    # Climb until a changed or already decided directory, then
+                    # record the answer for every directory passed on the way
+                    climbed = []
+                    result = stale_dirs.get(directory)
+                    while result is None:
+                        climbed.append(directory)
+                        if directory in changed_dirs:
+                            result = True
+                            break
+                        parent = os.path.dirname(directory)
+                        if parent == directory:
+                            result = False
+                            break
+                        directory = parent
+                        result = stale_dirs.get(directory)
+                    for climbed_dir in climbed:
+                        stale_dirs[climbed_dir] = result
+                    return result
                 
-                # Skip hidden files
-                if self.is_hidden_file(normalized_file_path):
+                for file_path in [path for path in listing if is_stale(os.path.dirname(path))]:
+                    del listing[file_path]
+            
+            for path in changed_paths:
+                if self.cancel_event.is_set():
+                    return
+                try:
+                    stat_info = os.stat(path, follow_symlinks=False)
+                except OSError:
+                    # Deleted or moved away
                     continue
+                if stat.S_ISDIR(stat_info.st_mode):
+                    known_dirs += 1
+                    listing.update(scan(path))
+                elif stat.S_ISREG(stat_info.st_mode) and not self.is_hidden_file(os.path.basename(path)):
+                    listing[path] = stat_info
+            
+            yield from listing.items()
+        
+        changed_paths = None
+        if quick and self.folder_watcher is not None and self._listing is not None:
+            changed_paths = self.folder_watcher.take_changes(normalized_root)
+        
+        if changed_paths is not None:
+            if self.progress_callback:
+                self.progress_callback(0, f"Quick rescan: {len(changed_paths)} paths changed since the last scan")
+            files = rescan(changed_paths)
+        else:
+            # Full walk; keep its listing only if later changes can be tracked
+            self._listing = None
+            watcher = self.folder_watcher
+            if watcher is not None:
+                if watcher.take_changes(normalized_root) is not None:
+                    # Already watching this root; the walk supersedes the recorded changes
+                    self._listing = {}
+                elif quick:
+                    # Setting up the watch can walk the tree itself, so only
+                    # searches that asked for quick rescans pay for it
+                    if self.progress_callback:
+                        self.progress_callback(0, "Setting up change tracking for quick rescans...")
+                    if watcher.start(normalized_root):
+                        self._listing = {}
+                else:
+                    watcher.stop()
+            files = scan(normalized_root)
+        
+        listing_complete = False
+        try:
+            for file_path, stat_info in files:
+                if changed_paths is None and self._listing is not None:
+                    self._listing[file_path] = stat_info
+                scanned_files += 1
+                file_size = stat_info.st_size
                 
-                # Skip if file is not accessible
-                if not os.path.isfile(normalized_file_path):
+                # First file of this size: defer reading until a match appears.
+                # setdefault both checks and records it with a single dict lookup.
+                current = (file_path, stat_info)
+                first_file = size_first.setdefault(file_size, current)
+                if first_file is current:
                     continue
                 
-                files.append(normalized_file_path)
+                if first_file is not None:
+                    add_to_bucket(*first_file)
+                    size_first[file_size] = None
+                add_to_bucket(file_path, stat_info)
+            
+            listing_complete = not self.cancel_event.is_set()
+        finally:
+            # A partial listing cannot stand in for a walk, whether the scan
+            # was stopped or failed
+            if not listing_complete:
+                self._listing = None
+        
+        # Only keep buckets with multiple files
+        sample_buckets = {key: files for key, files in sample_buckets.items() if len(files) > 1}
         
-        return files
+        # Report how many files each stage ruled out
+        if self.progress_callback:
+            remaining = sum(len(files) for files in sample_buckets.values())
+            self.progress_callback(60, f"Scanned {scanned_files} files: {sampled_files} share a size, "
+                                       f"{remaining} also match on head and tail")
+        
+        return sample_buckets
     
-    def group_by_size(self, files: List[str]) -> Dict[int, List[str]]:
+    def _inode(self, file_path: str) -> Optional[Tuple[int, int]]:
         """
-        Group files by their size.
+        Get the inode of a file recorded during the current search.
         
         Args:
-            files: List of file paths
+            file_path: Path to the file
             
         Returns:
-            Dictionary mapping file size to list of files with that size
+            (st_dev, st_ino) tuple, or None if unknown
         """
-        size_groups = {}
-        total_files = len(files)
+        stat_info = self._file_stats.get(file_path)
+        if stat_info is None or not stat_info.st_ino:
+            return None
+        return stat_info.st_dev, stat_info.st_ino
+    
+    def verify_bytewise(self, file_a: str, file_b: str) -> bool:
+        """
+        Compare the content of two files byte by byte.
         
-        for i, file_path in enumerate(files):
-            if self.stop_search:
-                break
-                
-            # Update progress
-            if self.progress_callback:
-                progress = 30 + (i / total_files) * 30  # 30-60% for size grouping
-                self.progress_callback(progress, f"Analyzing file sizes: {os.path.basename(file_path)}")
+        Both files are read into reused buffers in large chunks, and each
+        chunk pair is compared in a single C-level call. Stopping the search
+        ends the comparison after the current chunk.
+        
+        Args:
+            file_a: Path to the first file
+            file_b: Path to the second file
+            
+        Returns:
+            True if both files have identical content, False if they differ
+            or the search was stopped
+            
+        Raises:
+            OSError: If either file cannot be read
+        """
+        with open(file_a, "rb", buffering=0) as fa, open(file_b, "rb", buffering=0) as fb:
+            size = os.fstat(fa.fileno()).st_size
+            if os.fstat(fb.fileno()).st_size != size:
+                return False
+            advise_sequential(fa.fileno())
+            advise_sequential(fb.fileno())
+            
+            chunk_size = max(1, min(size, READ_CHUNK_SIZE))
+            buffer_a = bytearray(chunk_size)
+            buffer_b = bytearray(chunk_size)
+            while True:
+                if self.cancel_event.is_set():
+                    return False
+                read_a = read_full(fa, buffer_a)
+                read_b = read_full(fb, buffer_b)
+                if read_a != read_b:
+                    return False
+                if read_a < chunk_size:
+                    # Buffers are only left partly filled at the end of the files
+                    return buffer_a[:read_a] == buffer_b[:read_b]
+                if buffer_a != buffer_b:
+                    return False
+    
+    def verify_group(self, files: List[str]) -> List[List[str]]:
+        """
+        Split files sharing a hash into groups of byte-identical files.
+        
+        When verify_contents is off, the hash alone decides and all files
+        form one group.
+        
+        Args:
+            files: List of file paths with the same content hash
             
-            file_size = self.get_file_size(file_path)
-            if file_size is not None:
-                if file_size not in size_groups:
-                    size_groups[file_size] = []
-                size_groups[file_size].append(file_path)
+        Returns:
+            List of groups containing at least two identical files, or an
+            empty list if the search was stopped
+        """
+        if not self.verify_contents:
+            return [files] if len(files) > 1 else []
         
-        # Only keep groups with multiple files
-        return {size: files for size, files in size_groups.items() if len(files) > 1}
+        groups = []
+        
+        for file_path in files:
+            if self.cancel_event.is_set():
+                return []
+            
+            inode = self._inode(file_path)
+            for group in groups:
+                try:
+                    # Hard links to one inode are identical without reading them. Reflinked
+                    # copies share their hash but are still compared, since extents can
+                    # lag behind pending copy-on-write data.
+                    if ((inode is not None and self._inode(group[0]) == inode)
+                            or self.verify_bytewise(group[0], file_path)):
+                        group.append(file_path)
+                        break
+                except (IOError, OSError, PermissionError):
+                    break
+            else:
+                groups.append([file_path])
+        
+        return [group for group in groups if len(group) > 1]
     
-    def find_duplicates_by_hash(self, size_groups: Dict[int, List[str]]) -> Dict[str, List[str]]:
+    def make_hash_batches(self, files: List[Tuple[str, int]]) -> List[List[str]]:
         """
-        Find duplicates by calculating MD5 hashes for files with the same size.
+        Split files into batches for the hashing workers.
+        
+        Small files are packed together so that one worker round trip covers
+        many reads, while large files get a batch of their own and keep every
+        worker busy.
         
         Args:
-            size_groups: Dictionary mapping file size to list of files
+            files: List of (file path, file size) tuples
             
         Returns:
-            Dictionary mapping MD5 hash to list of duplicate files
+            List of file path batches
         """
-        duplicates = {}
-        total_files = sum(len(files) for files in size_groups.values())
+        batches = []
+        batch = []
+        batch_bytes = 0
+        
+        for file_path, file_size in files:
+            if batch and (len(batch) >= HASH_BATCH_FILES or batch_bytes + file_size > HASH_BATCH_BYTES):
+                batches.append(batch)
+                batch = []
+                batch_bytes = 0
+            batch.append(file_path)
+            batch_bytes += file_size
+        
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def hash_files(self, files: List[Tuple[str, int]]):
+        """
+        Hash files in parallel worker processes.
+        
+        Hashing independent files is embarrassingly parallel, so the work is
+        spread across processes in batches. Falls back to hashing in-process
+        when a single worker is requested or a process pool cannot be started,
+        and for the files left unhashed if a worker process dies.
+        
+        Args:
+            files: List of (file path, file size) tuples to hash
+            
+        Yields:
+            Tuples of (file path, hash string or None) in completion order
+        """
+        total_files = len(files)
         processed_files = 0
+        progress_scale = 40 / total_files if total_files else 0  # 60-100% for hashing
         
-        for size, files in size_groups.items():
-            if self.stop_search:
+        def report(file_path):
+            # Update progress
+            if self.progress_callback and self._progress_due():
+                progress = 60 + processed_files * progress_scale
+                self.progress_callback(progress, f"Calculating hash: {os.path.basename(file_path)}")
+        
+        if self.max_workers != 1 and total_files > 1:
+            batches = self.make_hash_batches(files)
+            
+            # No more processes than batches, since each one costs a start-up;
+            # forking a process running Tk is unsafe on macOS, so start fresh ones there
+            max_workers = min(self.max_workers or os.cpu_count() or 1, len(batches))
+            mp_context = multiprocessing.get_context("spawn") if sys.platform == "darwin" else None
+            try:
+                executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+            except (OSError, NotImplementedError, ValueError):
+                executor = None
+            
+            if executor is not None:
+                hashed = set()
+                with executor:
+                    try:
+                        futures = [executor.submit(hash_file_batch, batch) for batch in batches]
+                        for future in as_completed(futures):
+                            if self.cancel_event.is_set():
+                                for pending in futures:
+                                    pending.cancel()
+                                return
+                            
+                            results = future.result()
+                            processed_files += len(results)
+                            report(results[-1][0])
+                            hashed.update(file_path for file_path, _ in results)
+                            yield from results
+                        return
+                    except BrokenProcessPool:
+                        # A worker died; hash the remaining files in this process instead
+                        files = [(file_path, size) for file_path, size in files if file_path not in hashed]
+        
+        for file_path, _ in files:
+            if self.cancel_event.is_set():
                 break
+            
+            processed_files += 1
+            report(file_path)
+            # Read rather than map: a SIGBUS here would take down the UI process
+            yield file_path, hash_file(file_path, use_mmap=False)
+    
+    def iter_duplicates_by_hash(self, sample_buckets: Dict[Tuple[int, bytes], List[str]]) -> Iterator[Tuple[str, List[str]]]:
+        """
+        Find duplicates by calculating content hashes for files with the same size and sample.
+        
+        Files no larger than 2 * SAMPLE_SIZE were read completely when their
+        samples were compared, so their buckets are already exact duplicates
+        and are not read again. Files sharing a hash are compared byte by byte
+        to rule out collisions unless verify_contents is off. A bucket's groups
+        are yielded as soon as all of its files have been hashed. With a hash
+        cache, files whose size and mtime are unchanged since an earlier search
+        reuse their stored hash.
+        
+        Args:
+            sample_buckets: Dictionary mapping (size, sample) to list of files
+            
+        Yields:
+            Tuples of (content hash, list of duplicate files)
+        """
+        candidates = []
+        bucket_of = {}  # file_path -> index of its sample bucket
+        pending = {}  # bucket index -> number of files not hashed yet
+        bucket_hashes = {}  # bucket index -> content hash -> files
+        
+        cache = self.hash_cache
+        if cache is not None and not cache.open():
+            cache = None
+        
+        try:
+            for index, ((size, sample), files) in enumerate(sample_buckets.items()):
+                if self.cancel_event.is_set():
+                    return
+                if size == 0:
+                    yield self._EMPTY_HASH, files
+                elif size <= 2 * SAMPLE_SIZE:
+                    hasher = new_content_hasher()
+                    hasher.update(sample)
+                    yield hasher.hexdigest(), files
+                else:
+                    candidates.extend((file_path, size) for file_path in files)
+                    for file_path in files:
+                        bucket_of[file_path] = index
+                    pending[index] = len(files)
+                    bucket_hashes[index] = defaultdict(list)
+            
+            # Take unchanged files' hashes from the cache and only hash the rest
+            cached = []
+            if cache is not None:
+                uncached = []
+                for candidate in candidates:
+                    stat_info = self._file_stats.get(candidate[0])
+                    file_hash = None
+                    if stat_info is not None:
+                        file_hash = cache.lookup(candidate[0], stat_info.st_size, stat_info.st_mtime_ns,
+                                                 CONTENT_HASH_NAME)
+                    if file_hash is None:
+                        uncached.append(candidate)
+                    else:
+                        cached.append((candidate[0], file_hash))
+                candidates = uncached
+            
+            # Hard links and reflinked copies share their bytes on disk: hash one
+            # file of each and give the others the same hash
+            copies = defaultdict(list)  # hashed file -> files sharing its storage
+            storage_owner = {}  # inode or extent layout -> file hashed for it
+            reflink_devices = {}  # st_dev -> whether its filesystem supports reflinks
+            unique = []
+            for candidate in candidates:
+                file_path = candidate[0]
+                stat_info = self._file_stats.get(file_path)
+                keys = []
+                if stat_info is not None and stat_info.st_ino:
+                    keys.append((stat_info.st_dev, stat_info.st_ino))
+                owner = storage_owner.get(keys[0]) if keys else None
+                if owner is None and stat_info is not None:
+                    # Only filesystems with reflinks can have distinct files sharing extents
+                    reflinks = reflink_devices.get(stat_info.st_dev)
+                    if reflinks is None:
+                        reflinks = reflink_devices[stat_info.st_dev] = can_share_extents(file_path)
+                    # Byte verification confirms extent matches, so only force
+                    # writeback of dirty pages when matches are trusted as they are
+                    extents = physical_extents(file_path, sync=not self.verify_contents) if reflinks else None
+                    if extents is not None:
+                        keys.append((stat_info.st_dev, stat_info.st_size, extents))
+                        owner = storage_owner.get(keys[-1])
                 
-            for file_path in files:
-                if self.stop_search:
-                    break
-                    
-                processed_files += 1
+                if owner is None:
+                    for key in keys:
+                        storage_owner[key] = file_path
+                    unique.append(candidate)
+                else:
+                    copies[owner].append(file_path)
+                    self._shared_storage[file_path] = owner
+            candidates = unique
+            
+            # Read in inode order, which roughly follows on-disk layout and saves seeks on HDDs
+            def disk_location(candidate):
+                stat_info = self._file_stats.get(candidate[0])
+                return (stat_info.st_dev, stat_info.st_ino) if stat_info else (0, 0)
+            
+            candidates.sort(key=disk_location)
+            
+            if self.progress_callback:
+                self.progress_callback(60, f"Hashing {len(candidates)} candidate files with {CONTENT_HASH_NAME}"
+                                           f" ({len(cached)} cached, {len(self._shared_storage)} sharing storage)")
+            
+            def hashed_files():
+                yield from cached
+                for hashed_path, file_hash in self.hash_files(candidates):
+                    for file_path in [hashed_path] + copies.get(hashed_path, []):
+                        stat_info = self._file_stats.get(file_path)
+                        if cache is not None and file_hash is not None and stat_info is not None:
+                            cache.store(file_path, stat_info.st_size, stat_info.st_mtime_ns,
+                                        CONTENT_HASH_NAME, file_hash)
+                        yield file_path, file_hash
+            
+            for file_path, file_hash in hashed_files():
+                index = bucket_of[file_path]
+                if file_hash is not None:
+                    bucket_hashes[index][file_hash].append(file_path)
                 
-                # Update progress
-                if self.progress_callback:
-                    progress = 60 + (processed_files / total_files) * 40  # 60-100% for hashing
-                    self.progress_callback(progress, f"Calculating hash: {os.path.basename(file_path)}")
+                pending[index] -= 1
+                if pending[index]:
+                    continue
                 
-                file_hash = self.calculate_md5(file_path)
-                if file_hash is not None:
-                    if file_hash not in duplicates:
-                        duplicates[file_hash] = []
-                    duplicates[file_hash].append(file_path)
+                # Confirm hash matches byte by byte and keep actual duplicates only
+                for hash_val, files in bucket_hashes.pop(index).items():
+                    if len(files) < 2 or self.cancel_event.is_set():
+                        continue
+                    for i, group in enumerate(self.verify_group(files)):
+                        if self.cancel_event.is_set():
+                            return
+                        yield (hash_val if i == 0 else f"{hash_val}-{i}"), group
+        finally:
+            # Keep whatever was hashed, even when the search is stopped early
+            if cache is not None:
+                cache.close()
+    
+    def find_duplicates_by_hash(self, sample_buckets: Dict[Tuple[int, bytes], List[str]]) -> Dict[str, List[str]]:
+        """
+        Find duplicates among bucketed files.
         
-        # Only keep groups with multiple files (actual duplicates)
-        return {hash_val: files for hash_val, files in duplicates.items() if len(files) > 1}
+        Args:
+            sample_buckets: Dictionary mapping (size, sample) to list of files
+            
+        Returns:
+            Dictionary mapping content hash to list of duplicate files
+        """
+        return dict(self.iter_duplicates_by_hash(sample_buckets))
     
-    def find_duplicates(self, root_dir: str) -> Dict[str, List[str]]:
+    def find_duplicates_iter(self, root_dir: str, cancel_event: Optional[threading.Event] = None,
+                             quick: bool = False) -> Iterator[Tuple[str, List[str]]]:
         """
-        Find all duplicate files in a directory.
+        Find all duplicate files in a directory, yielding groups as they are confirmed.
         
         Args:
             root_dir: Root directory to search
+            cancel_event: Event that stops this search when set; a new one is used if omitted
+            quick: Only revisit paths changed since the previous search of root_dir
             
-        Returns:
-            Dictionary mapping hash to list of duplicate files
+        Yields:
+            Tuples of (hash, list of duplicate files)
         """
-        self.stop_search = False
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self._normalized_paths.clear()
+        self._file_stats.clear()
+        self._shared_storage.clear()
         
         if self.progress_callback:
             self.progress_callback(0, "Starting duplicate search...")
         
-        # Step 1: Get all files
-        files = self.get_all_files(root_dir)
-        
-        if self.stop_search:
-            return {}
+        # Step 1: Collect files bucketed by size and sampled bytes
+        sample_buckets = self.enumerate_and_bucket(root_dir, quick)
         
-        # Step 2: Group by size
-        size_groups = self.group_by_size(files)
+        if self.cancel_event.is_set():
+            return
         
-        if self.stop_search:
-            return {}
-        
-        # Step 3: Find duplicates by hash
-        duplicates = self.find_duplicates_by_hash(size_groups)
+        # Step 2: Find duplicates by hash
+        group_count = 0
+        for hash_val, files in self.iter_duplicates_by_hash(sample_buckets):
+            group_count += 1
+            yield hash_val, files
         
         if self.progress_callback:
-            self.progress_callback(100, f"Found {len(duplicates)} duplicate groups")
+            self.progress_callback(100, f"Found {group_count} duplicate groups")
+        
+        self._normalized_paths.clear()
+        self._file_stats.clear()
+        self._shared_storage.clear()
+    
+    def find_duplicates(self, root_dir: str) -> Dict[str, List[str]]:
+        """
+        Find all duplicate files in a directory.
         
-        return duplicates
+        Args:
+            root_dir: Root directory to search
+            
+        Returns:
+            Dictionary mapping hash to list of duplicate files
+        """
+        return dict(self.find_duplicates_iter(root_dir))
     
     def stop(self):
         """Stop the current search operation."""
-        self.stop_search = True 
\ No newline at end of file
+        self.cancel_event.set() 
\ No newline at end of file
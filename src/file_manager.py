@@ -3,11 +3,179 @@ File manager module for handling file operations including moving files to trash
 """
 
 import os
+import re
+import sys
 import shutil
-from typing import List, Dict, Optional
+import struct
+from functools import lru_cache
+from typing import Callable, List, Dict, Optional, Tuple
 from pathlib import Path
 import send2trash
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Linux FS_IOC_FIEMAP request and struct layouts from linux/fiemap.h
+_FS_IOC_FIEMAP = 0xC020660B
+_FIEMAP_HEADER = struct.Struct("=QQIIII")  # fm_start, fm_length, fm_flags, fm_mapped_extents, fm_extent_count, fm_reserved
+_FIEMAP_EXTENT = struct.Struct("=QQQQQIIII")  # fe_logical, fe_physical, fe_length, reserved, fe_flags, reserved
+_FIEMAP_FLAG_SYNC = 0x1  # Write back dirty pages first so pending copy-on-write data is mapped
+_FIEMAP_EXTENT_LAST = 0x1
+# Unknown, delayed, encoded, encrypted, unaligned, inline, tail-packed or unwritten
+# extents do not reliably identify the bytes stored on disk
+_FIEMAP_EXTENT_UNRELIABLE = 0x2 | 0x4 | 0x8 | 0x80 | 0x100 | 0x200 | 0x400 | 0x800
+_FIEMAP_MAX_EXTENTS = 32
+
+# Linux filesystems on which separate files can share extents through reflinks
+REFLINK_FILESYSTEMS = ("btrfs", "xfs", "bcachefs")
+
+# Files handed to send2trash per call; progress is reported after each call
+TRASH_BATCH_SIZE = 100
+
+
+@lru_cache(maxsize=4096)
+def _format_file_size(size_bytes: int) -> str:
+    """Format a size in bytes; cached since duplicate groups repeat sizes."""
+    if size_bytes == 0:
+        return "0 B"
+    
+    size_names = ["B", "KB", "MB", "GB", "TB"]
+    # Each unit is 2**10 times the previous one, so the bit length gives the unit
+    i = min(len(size_names) - 1, (size_bytes.bit_length() - 1) // 10)
+    
+    return f"{size_bytes / (1 << (i * 10)):.1f} {size_names[i]}"
+
+
+def filesystem_type(path: str) -> Optional[str]:
+    """
+    Get the type of the filesystem a path lives on.
+    
+    Read from the longest matching mount point in /proc/self/mountinfo,
+    so only available on Linux.
+    
+    Args:
+        path: Absolute path of a file or directory
+        
+    Returns:
+        Filesystem type such as "ext4" or "btrfs", or None if unknown
+    """
+    try:
+        with open("/proc/self/mountinfo", encoding="utf-8", errors="replace") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    
+    best_mount, best_type = "", None
+    for line in lines:
+        fields, _, rest = line.partition(" - ")
+        fields, rest = fields.split(), rest.split()
+        if len(fields) < 5 or not rest:
+            continue
+        # Spaces and other special characters are escaped as octal
+        mount_point = re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), fields[4])
+        prefix = mount_point.rstrip("/") + "/"
+        if (path == mount_point or path.startswith(prefix)) and len(mount_point) >= len(best_mount):
+            best_mount, best_type = mount_point, rest[0]
+    return best_type
+
+
+def can_share_extents(path: str) -> bool:
+    """
+    Check whether files on the filesystem of a path can be reflinked copies.
+    
+    Extent layouts are only worth comparing where separate files can share
+    them; elsewhere the FIEMAP query never finds a match.
+    
+    Args:
+        path: Absolute path of a file
+        
+    Returns:
+        True on Linux filesystems supporting reflinks, False otherwise
+    """
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    return filesystem_type(path) in REFLINK_FILESYSTEMS
+
+
+def physical_extents(file_path: str, sync: bool = True) -> Optional[Tuple[Tuple[int, int, int], ...]]:
+    """
+    Get the on-disk extents of a file.
+    
+    Files cloned with reflinks (cp --reflink, btrfs/XFS dedupe) share their
+    extents, so equal extent lists mean equal content without reading it.
+    Only available on Linux through FS_IOC_FIEMAP.
+    
+    Args:
+        file_path: Path to the file
+        sync: Write back the file's dirty pages first. Without it, a recently
+            modified reflink copy can still report the original's extents, so
+            callers skipping it must confirm matches by reading the files.
+        
+    Returns:
+        Tuple of (logical offset, physical offset, length) per extent, or None
+        if the layout is unavailable, fragmented beyond the query or not final
+    """
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return None
+    
+    buffer = bytearray(_FIEMAP_HEADER.size + _FIEMAP_MAX_EXTENTS * _FIEMAP_EXTENT.size)
+    request_flags = _FIEMAP_FLAG_SYNC if sync else 0
+    _FIEMAP_HEADER.pack_into(buffer, 0, 0, 0xFFFFFFFFFFFFFFFF, request_flags, 0, _FIEMAP_MAX_EXTENTS, 0)
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            fcntl.ioctl(fd, _FS_IOC_FIEMAP, buffer)
+        finally:
+            os.close(fd)
+    except OSError:
+        return None
+    
+    extents = []
+    flags = 0
+    for i in range(_FIEMAP_HEADER.unpack_from(buffer, 0)[3]):
+        logical, physical, length, _, _, flags, _, _, _ = _FIEMAP_EXTENT.unpack_from(
+            buffer, _FIEMAP_HEADER.size + i * _FIEMAP_EXTENT.size)
+        if flags & _FIEMAP_EXTENT_UNRELIABLE:
+            return None
+        extents.append((logical, physical, length))
+    
+    # Without the last-extent flag the file has more extents than were requested
+    if not extents or not flags & _FIEMAP_EXTENT_LAST:
+        return None
+    return tuple(extents)
+
+
+def same_physical_extent(path_a: str, path_b: str) -> bool:
+    """
+    Check whether two files are backed by the same bytes on disk.
+    
+    True for hard links to the same inode and, on Linux, for reflinked
+    copies of equal size. False means unknown, not different.
+    
+    Args:
+        path_a: Path to the first file
+        path_b: Path to the second file
+        
+    Returns:
+        True if both files share their storage, False otherwise
+    """
+    try:
+        stat_a = os.stat(path_a)
+        stat_b = os.stat(path_b)
+    except OSError:
+        return False
+    
+    if stat_a.st_ino and (stat_a.st_dev, stat_a.st_ino) == (stat_b.st_dev, stat_b.st_ino):
+        return True
+    if stat_a.st_dev != stat_b.st_dev or stat_a.st_size != stat_b.st_size or not can_share_extents(path_a):
+        return False
+    
+    extents = physical_extents(path_a)
+    return extents is not None and extents == physical_extents(path_b)
+
 
 class FileManager:
     """
@@ -38,6 +206,28 @@ class FileManager:
             # If resolve fails, try basic normalization
             return os.path.normpath(os.path.abspath(file_path))
     
+    def _check_trashable(self, file_path: str) -> bool:
+        """
+        Check that a path exists and is a regular file, recording an error otherwise.
+        
+        Args:
+            file_path: Path to check
+            
+        Returns:
+            True if the file can be moved to trash, False otherwise
+        """
+        # Check if file exists
+        if not os.path.exists(file_path):
+            self.errors.append(f"File not found: {file_path}")
+            return False
+        
+        # Check if file is actually a file (not a directory)
+        if not os.path.isfile(file_path):
+            self.errors.append(f"Path is not a file: {file_path}")
+            return False
+        
+        return True
+    
     def move_to_trash(self, file_path: str) -> bool:
         """
         Move a file to trash (system trash/recycle bin).
@@ -49,22 +239,12 @@ class FileManager:
             True if successful, False otherwise
         """
         try:
-            # Normalize the path first
-            normalized_path = self._normalize_path(file_path)
-            
-            # Check if file exists using normalized path
-            if not os.path.exists(normalized_path):
-                self.errors.append(f"File not found: {normalized_path}")
-                return False
-            
-            # Check if file is actually a file (not a directory)
-            if not os.path.isfile(normalized_path):
-                self.errors.append(f"Path is not a file: {normalized_path}")
+            if not self._check_trashable(file_path):
                 return False
             
             # Try to move to trash
-            send2trash.send2trash(normalized_path)
-            self.deleted_files.append(normalized_path)
+            send2trash.send2trash(file_path)
+            self.deleted_files.append(file_path)
             return True
             
         except PermissionError as e:
@@ -80,19 +260,73 @@ class FileManager:
             self.errors.append(f"Error moving {file_path} to trash: {str(e)}")
             return False
     
-    def move_files_to_trash(self, file_paths: List[str]) -> Dict[str, bool]:
+    def move_files_to_trash(self, file_paths: List[str],
+                            progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, bool]:
         """
         Move multiple files to trash.
         
+        Files are sent to send2trash in batches of TRASH_BATCH_SIZE so the
+        platform trash API is invoked once per batch. If a batch fails, each
+        of its files is retried on its own to report individual results.
+        Batches run one after another: the freedesktop trash picks a free
+        name before moving, so concurrent calls could give two files with
+        the same name the same trash entry.
+        
+        Args:
+            file_paths: List of file paths to be moved to trash
+            progress_callback: Called with (files processed, total files) after each batch
+            
+        Returns:
+            Dictionary mapping file path to success status
+        """
+        results = {}
+        for start in range(0, len(file_paths), TRASH_BATCH_SIZE):
+            results.update(self._move_batch_to_trash(file_paths[start:start + TRASH_BATCH_SIZE]))
+            if progress_callback:
+                progress_callback(len(results), len(file_paths))
+        return results
+    
+    def _move_batch_to_trash(self, file_paths: List[str]) -> Dict[str, bool]:
+        """
+        Move a batch of files to trash with a single send2trash call.
+        
         Args:
             file_paths: List of file paths to be moved to trash
             
         Returns:
             Dictionary mapping file path to success status
         """
+        if len(file_paths) < 2:
+            return {file_path: self.move_to_trash(file_path) for file_path in file_paths}
+        
         results = {}
+        valid_paths = []
         for file_path in file_paths:
-            results[file_path] = self.move_to_trash(file_path)
+            try:
+                is_valid = self._check_trashable(file_path)
+            except OSError as e:
+                self.errors.append(f"OS error moving {file_path} to trash: {str(e)}")
+                is_valid = False
+            results[file_path] = is_valid
+            if is_valid:
+                valid_paths.append(file_path)
+        
+        if not valid_paths:
+            return results
+        
+        try:
+            send2trash.send2trash(valid_paths)
+            self.deleted_files.extend(valid_paths)
+            return results
+        except Exception:
+            pass
+        
+        # Batch failed part way: files already gone were moved by it
+        for file_path in valid_paths:
+            if not os.path.exists(file_path):
+                self.deleted_files.append(file_path)
+            else:
+                results[file_path] = self.move_to_trash(file_path)
         return results
     
     def get_file_info(self, file_path: str) -> Optional[Dict]:
@@ -106,24 +340,32 @@ class FileManager:
             Dictionary with file information or None if file doesn't exist
         """
         try:
-            # Normalize path first
-            normalized_path = self._normalize_path(file_path)
-            
-            if not os.path.exists(normalized_path):
-                return None
-                
-            stat_info = os.stat(normalized_path)
-            return {
-                'path': normalized_path,
-                'name': os.path.basename(normalized_path),
-                'size': stat_info.st_size,
-                'modified': stat_info.st_mtime,
-                'directory': os.path.dirname(normalized_path),
-                'exists': True
-            }
+            # A single stat both checks existence and gathers the details
+            return self.file_info_from_stat(file_path, os.stat(file_path))
         except Exception as e:
+            # Missing or inaccessible file
             return None
     
+    def file_info_from_stat(self, file_path: str, stat_info: os.stat_result) -> Dict:
+        """
+        Build file information from stat data that is already available.
+        
+        Args:
+            file_path: Path to the file
+            stat_info: Stat result for the file, e.g. from a directory scan
+            
+        Returns:
+            Dictionary with the same fields as get_file_info
+        """
+        return {
+            'path': file_path,
+            'name': os.path.basename(file_path),
+            'size': stat_info.st_size,
+            'modified': stat_info.st_mtime,
+            'directory': os.path.dirname(file_path),
+            'exists': True
+        }
+    
     def format_file_size(self, size_bytes: int) -> str:
         """
         Format file size in human-readable format.
@@ -134,34 +376,25 @@ class FileManager:
         Returns:
             Formatted size string
         """
-        if size_bytes == 0:
-            return "0 B"
-        
-        size_names = ["B", "KB", "MB", "GB", "TB"]
-        i = 0
-        size_float = float(size_bytes)
-        while size_float >= 1024 and i < len(size_names) - 1:
-            size_float /= 1024.0
-            i += 1
-        
-        return f"{size_float:.1f} {size_names[i]}"
+        return _format_file_size(size_bytes)
     
     def get_relative_path(self, file_path: str, base_path: str) -> str:
         """
         Get relative path from base path.
         
+        File paths produced by the detector are already resolved, so only
+        the user-supplied base path is normalized.
+        
         Args:
-            file_path: Full file path
+            file_path: Full (resolved) file path
             base_path: Base directory path
             
         Returns:
             Relative path string
         """
         try:
-            # Normalize both paths first
-            normalized_file = self._normalize_path(file_path)
             normalized_base = self._normalize_path(base_path)
-            return os.path.relpath(normalized_file, normalized_base)
+            return os.path.relpath(file_path, normalized_base)
         except ValueError:
             return file_path
     
@@ -0,0 +1,126 @@
+"""
+Folder watcher module.
+Records paths that change under a searched folder so a later search can skip the full directory walk.
+"""
+
+import threading
+from typing import Optional, Set
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+
+# Event types that can change which files exist or what they contain
+CHANGE_EVENTS = ("created", "modified", "deleted", "moved")
+
+
+class _ChangeRecorder(FileSystemEventHandler):
+    """Forwards filesystem events to a FolderWatcher."""
+    
+    def __init__(self, watcher: "FolderWatcher"):
+        super().__init__()
+        self.watcher = watcher
+    
+    def on_any_event(self, event):
+        # A directory's own mtime changes whenever an entry is added or removed;
+        # the entry itself is reported separately
+        if event.event_type not in CHANGE_EVENTS or (event.is_directory and event.event_type == "modified"):
+            return
+        self.watcher.record(event.src_path, getattr(event, "dest_path", ""))
+
+
+class FolderWatcher:
+    """
+    Collects changed paths under one folder using the optional watchdog package
+    (inotify on Linux, FSEvents on macOS, ReadDirectoryChangesW on Windows).
+    
+    Without watchdog, or when the watch cannot be set up, no changes are
+    reported and every search walks the whole tree.
+    """
+    
+    def __init__(self):
+        self._observer = None
+        self._root = None
+        self._changes: Set[str] = set()
+        self._lock = threading.Lock()  # Events arrive on the observer thread
+    
+    @staticmethod
+    def available() -> bool:
+        """Check whether the watchdog package is installed."""
+        return Observer is not None
+    
+    def start(self, root: str) -> bool:
+        """
+        Start watching a folder, replacing any previous watch.
+        
+        Args:
+            root: Folder to watch recursively
+            
+        Returns:
+            True if the folder is being watched, False otherwise
+        """
+        self.stop()
+        if Observer is None:
+            return False
+        
+        with self._lock:
+            self._changes = set()
+        
+        observer = Observer()
+        try:
+            observer.schedule(_ChangeRecorder(self), root, recursive=True)
+            observer.start()
+        except (OSError, RecursionError):
+            # Watch limit reached, folder not watchable, or a tree too deep
+            # for the recursive walk some backends use to add their watches
+            return False
+        
+        self._observer = observer
+        self._root = root
+        return True
+    
+    def record(self, src_path: str, dest_path: str = ""):
+        """
+        Remember that a path changed.
+        
+        Args:
+            src_path: Path the event refers to
+            dest_path: New path of a moved file or folder, if any
+        """
+        with self._lock:
+            self._changes.add(src_path)
+            if dest_path:
+                self._changes.add(dest_path)
+    
+    def take_changes(self, root: str) -> Optional[Set[str]]:
+        """
+        Get the paths changed under a folder since the last call and reset them.
+        
+        Args:
+            root: Folder the caller is about to search
+            
+        Returns:
+            Set of changed paths, or None if the folder is not being watched
+            continuously and must be walked again
+        """
+        if self._observer is None or self._root != root or not self._observer.is_alive():
+            return None
+        
+        with self._lock:
+            changes = self._changes
+            self._changes = set()
+        return changes
+    
+    def stop(self):
+        """Stop watching."""
+        if self._observer is None:
+            return
+        
+        self._observer.stop()
+        self._observer.join(timeout=1)
+        self._observer = None
+        self._root = None
@@ -0,0 +1,144 @@
+"""
+Hash cache module.
+Persists content hashes between searches so unchanged files are not read again.
+"""
+
+import os
+import sqlite3
+from typing import List, Optional, Tuple
+
+
+# Default location of the cache database
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "duplicate_deleter", "hashes.db")
+
+# Number of new hashes buffered before they are written in one transaction
+COMMIT_BATCH_SIZE = 1000
+
+# Bumped whenever the table layout changes; older tables are dropped and rebuilt
+SCHEMA_VERSION = 2
+
+
+class HashCache:
+    """
+    SQLite store of content hashes keyed by path, size and modification time.
+    
+    A stored hash is only reused while the file's size and mtime still match
+    the values recorded with it and it was computed with the same algorithm.
+    The connection is opened for the duration of a search by whichever
+    thread runs it.
+    """
+    
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH):
+        self.db_path = db_path
+        self._connection = None
+        self._pending: List[Tuple[str, int, int, str, str]] = []  # Rows not yet written
+    
+    def open(self) -> bool:
+        """
+        Open the cache database, creating it if needed.
+        
+        Returns:
+            True if the cache is usable, False otherwise
+        """
+        if self._connection is not None:
+            return True
+        
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            connection = sqlite3.connect(self.db_path)
+            with connection:
+                if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    connection.execute("DROP TABLE IF EXISTS hashes")
+                    connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS hashes ("
+                    "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+                    "algorithm TEXT NOT NULL, hash TEXT NOT NULL)")
+        except (OSError, sqlite3.Error):
+            return False
+        
+        self._connection = connection
+        return True
+    
+    def lookup(self, file_path: str, size: int, mtime_ns: int, algorithm: str) -> Optional[str]:
+        """
+        Get the cached hash of a file if it has not changed since it was stored.
+        
+        Args:
+            file_path: Path to the file
+            size: Current size of the file in bytes
+            mtime_ns: Current modification time in nanoseconds
+            algorithm: Name of the hash algorithm in use
+            
+        Returns:
+            Cached hash string, or None if missing, stale or from another algorithm
+        """
+        if self._connection is None:
+            return None
+        
+        try:
+            row = self._connection.execute(
+                "SELECT hash FROM hashes WHERE path = ? AND size = ? AND mtime_ns = ? AND algorithm = ?",
+                (file_path, size, mtime_ns, algorithm)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+    
+    def store(self, file_path: str, size: int, mtime_ns: int, algorithm: str, file_hash: str):
+        """
+        Record the hash of a file. Rows are written in batches.
+        
+        Args:
+            file_path: Path to the file
+            size: Size of the file in bytes
+            mtime_ns: Modification time in nanoseconds
+            algorithm: Name of the hash algorithm that produced the hash
+            file_hash: Content hash of the file
+        """
+        if self._connection is None:
+            return
+        
+        self._pending.append((file_path, size, mtime_ns, algorithm, file_hash))
+        if len(self._pending) >= COMMIT_BATCH_SIZE:
+            self.flush()
+    
+    def flush(self):
+        """Write buffered hashes to the database."""
+        if self._connection is None or not self._pending:
+            return
+        
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO hashes (path, size, mtime_ns, algorithm, hash) VALUES (?, ?, ?, ?, ?)",
+                    self._pending)
+        except sqlite3.Error:
+            pass  # Caching is best effort; the hashes are simply computed again next time
+        self._pending.clear()
+    
+    def close(self):
+        """Flush buffered hashes and close the database."""
+        if self._connection is None:
+            return
+        
+        self.flush()
+        self._connection.close()
+        self._connection = None
+    
+    def clear(self) -> bool:
+        """
+        Delete every cached hash.
+        
+        The database file is removed rather than emptied, so this can be
+        called from a different thread than the one running a search.
+        
+        Returns:
+            True if the cache was removed or did not exist, False otherwise
+        """
+        try:
+            os.remove(self.db_path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False
+        return True
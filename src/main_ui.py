@@ -6,14 +6,19 @@ Built with TKinter for cross-platform use.
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
+import queue
 import os
 import platform
 import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, List, Optional, Set
+from collections import deque
 from datetime import datetime
 
 from .duplicate_detector import DuplicateDetector
 from .file_manager import FileManager
+from .folder_watcher import FolderWatcher
+from .hash_cache import HashCache
 
 
 class DuplicateFileDeleterApp:
@@ -21,6 +26,12 @@ class DuplicateFileDeleterApp:
     Main application class for the Duplicate File Deleter.
     """
     
+    PROGRESS_POLL_MS = 50  # Interval between progress queue drains
+    MAX_PROGRESS_LINES = 500  # Older progress log lines are discarded
+    RENDER_CHUNK_ROWS = 500  # File rows inserted per idle callback
+    EAGER_ROWS = 1000  # Groups are shown expanded until this many file rows exist; later ones load on open
+    _CHK = ("☐", "☑")  # Delete column text, indexed by selection state
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Duplicate File Deleter")
@@ -28,22 +39,45 @@ class DuplicateFileDeleterApp:
         self.root.resizable(True, True)
         
         # Initialize components
-        self.detector = DuplicateDetector(progress_callback=self.update_progress)
+        self.hash_cache = HashCache()
+        self.folder_watcher = FolderWatcher()
+        self.detector = DuplicateDetector(progress_callback=self.update_progress, hash_cache=self.hash_cache,
+                                          folder_watcher=self.folder_watcher)
         self.file_manager = FileManager()
         
         # Application state
         self.selected_folder = tk.StringVar()
+        self.verify_contents = tk.BooleanVar(value=True)  # Paranoid mode: confirm hash matches byte by byte
         self.is_searching = False
-        self.search_thread = None
-        self.duplicates = {}
+        self._executor = ThreadPoolExecutor(max_workers=1)  # Runs one search at a time
+        self._search_future = None  # Future of the latest search
+        self._cancel_event = None  # Stops the latest search when set
+        self._closed = False  # Set once the window is closing; workers must not schedule Tk calls then
         self.duplicate_groups = []
-        self.file_selections = {}  # file_path -> boolean (True = selected for deletion)
+        self.all_files = set()  # Paths of every file shown in the tree
+        self.selected_paths = set()  # Paths selected for deletion
+        self.file_group = {}  # file_path -> tree item of its group
+        self.group_selected_count = {}  # group tree item -> number of selected files
+        self._item_to_path = {}  # file tree item -> file_path
+        self._path_to_item = {}  # file_path -> file tree item
+        self._item_cols = {}  # file tree item -> values after the Delete column
+        self._group_paths = {}  # group tree item -> its file paths in display order
+        self._unpopulated = {}  # group tree item -> (file_path, name, item_cols) rows not inserted yet
+        self._populated_rows = 0  # File rows inserted into the tree
+        self._render_job = None  # Pending after id while results render
+        self._result_queue = None  # (hash, files) groups from the search thread; None marks the end
+        self._progress_queue = queue.Queue()  # (progress, message) from any thread
         
         # Create UI
         self.create_widgets()
         
         # Style configuration
         self.configure_styles()
+        
+        # Apply queued progress updates periodically on the UI thread
+        self.root.after(self.PROGRESS_POLL_MS, self._drain_progress)
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def configure_styles(self):
         """Configure custom styles for the application."""
@@ -113,9 +147,18 @@ class DuplicateFileDeleterApp:
         self.search_button = ttk.Button(folder_frame, text="Search for Duplicates", command=self.start_search)
         self.search_button.grid(row=0, column=2, padx=(10, 0))
         
+        # Quick rescan button
+        self.quick_rescan_button = ttk.Button(folder_frame, text="Quick Rescan", command=self.quick_rescan)
+        self.quick_rescan_button.grid(row=0, column=3, padx=(10, 0))
+        
         # Stop button
         self.stop_button = ttk.Button(folder_frame, text="Stop Search", command=self.stop_search, state=tk.DISABLED)
-        self.stop_button.grid(row=0, column=3, padx=(10, 0))
+        self.stop_button.grid(row=0, column=4, padx=(10, 0))
+        
+        # Byte-by-byte verification toggle
+        self.verify_check = ttk.Checkbutton(folder_frame, text="Verify byte by byte",
+                                            variable=self.verify_contents)
+        self.verify_check.grid(row=0, column=5, padx=(10, 0))
         
         folder_frame.columnconfigure(0, weight=1)
     
@@ -134,7 +177,9 @@ class DuplicateFileDeleterApp:
         self.progress_label.grid(row=0, column=1)
         
         # Progress text area
-        self.progress_text = scrolledtext.ScrolledText(progress_frame, height=4, width=80)
+        # Read-only log without undo history, so inserts are not recorded
+        self.progress_text = scrolledtext.ScrolledText(progress_frame, height=4, width=80,
+                                                       undo=False, state=tk.DISABLED)
         self.progress_text.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
         
         progress_frame.columnconfigure(0, weight=1)
@@ -146,7 +191,7 @@ class DuplicateFileDeleterApp:
         results_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         
         # Create treeview for displaying duplicates
-        self.tree = ttk.Treeview(results_frame, columns=('Delete', 'Size', 'Path', 'file_path'), show='tree headings')
+        self.tree = ttk.Treeview(results_frame, columns=('Delete', 'Size', 'Path'), show='tree headings')
         self.tree.heading('#0', text='File Name')
         self.tree.heading('Delete', text='Delete')
         self.tree.heading('Size', text='Size')
@@ -157,7 +202,6 @@ class DuplicateFileDeleterApp:
         self.tree.column('Delete', width=60)
         self.tree.column('Size', width=100)
         self.tree.column('Path', width=400)
-        self.tree.column('file_path', width=0)  # Hidden column for storing file path
         
         # Scrollbars for treeview
         tree_scrollbar_y = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.tree.yview)
@@ -176,6 +220,7 @@ class DuplicateFileDeleterApp:
         # Bind events
         self.tree.bind('<Double-1>', self.on_item_double_click)
         self.tree.bind('<Button-1>', self.on_item_click)
+        self.tree.bind('<<TreeviewOpen>>', self.on_group_open)
         
         results_frame.columnconfigure(0, weight=1)
         results_frame.rowconfigure(0, weight=1)
@@ -209,7 +254,11 @@ class DuplicateFileDeleterApp:
         # Clear results button
         self.clear_button = ttk.Button(action_frame, text="Clear Results", 
                                       command=self.clear_results, state=tk.DISABLED)
-        self.clear_button.grid(row=0, column=4)
+        self.clear_button.grid(row=0, column=4, padx=(0, 10))
+        
+        # Clear hash cache button
+        self.clear_cache_button = ttk.Button(action_frame, text="Clear Cache", command=self.clear_cache)
+        self.clear_cache_button.grid(row=0, column=5)
     
     def browse_folder(self):
         """Open folder selection dialog."""
@@ -217,8 +266,13 @@ class DuplicateFileDeleterApp:
         if folder_path:
             self.selected_folder.set(folder_path)
     
-    def start_search(self):
-        """Start the duplicate search process."""
+    def start_search(self, quick: bool = False):
+        """
+        Start the duplicate search process.
+        
+        Args:
+            quick: Only revisit files changed since the previous search of the folder
+        """
         folder_path = self.selected_folder.get().strip()
         if not folder_path:
             messagebox.showerror("Error", "Please select a folder to search.")
@@ -233,101 +287,228 @@ class DuplicateFileDeleterApp:
         
         # Update UI state
         self.is_searching = True
-        self.search_button.config(state=tk.DISABLED)
+        self.set_search_controls_state(tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
-        self.browse_button.config(state=tk.DISABLED)
-        
-        # Start search in separate thread
-        self.search_thread = threading.Thread(target=self.search_duplicates, args=(folder_path,))
-        self.search_thread.daemon = True
-        self.search_thread.start()
+        self.detector.verify_contents = self.verify_contents.get()
+        
+        # Show groups as the search thread confirms them
+        result_queue = queue.Queue()
+        self.display_results(result_queue)
+        
+        # Start search on the worker thread; a stopped search still winding
+        # down finishes before this one starts
+        self._cancel_event = threading.Event()
+        self._search_future = self._executor.submit(
+            self.search_duplicates, folder_path, result_queue, self._cancel_event, quick)
+        self._search_future.add_done_callback(
+            lambda future: self._call_on_ui(self._on_search_done, future))
+    
+    def quick_rescan(self):
+        """Search again, walking only what changed since the last search when possible."""
+        self.start_search(quick=True)
     
     def stop_search(self):
         """Stop the current search."""
-        if self.detector:
-            self.detector.stop()
+        if self._cancel_event:
+            self._cancel_event.set()
         self.is_searching = False
         self.update_progress(0, "Search stopped by user")
         self.reset_ui_state()
     
-    def search_duplicates(self, folder_path: str):
-        """Search for duplicates in the specified folder."""
+    def search_duplicates(self, folder_path: str, result_queue: queue.Queue, cancel_event: threading.Event,
+                          quick: bool = False):
+        """Search for duplicates in the specified folder, streaming groups to the UI."""
         try:
-            self.duplicates = self.detector.find_duplicates(folder_path)
-            
-            # Update UI on main thread
-            self.root.after(0, self.display_results)
+            for hash_value, files in self.detector.find_duplicates_iter(folder_path, cancel_event, quick):
+                # Reuse stat data from the detector's scan rather than statting each file again
+                file_infos = []
+                for file_path in files:
+                    stat_info = self.detector.get_file_stat(file_path)
+                    if stat_info is not None:
+                        file_infos.append(self.file_manager.file_info_from_stat(file_path, stat_info))
+                    else:
+                        file_info = self.file_manager.get_file_info(file_path)
+                        if file_info:
+                            file_infos.append(file_info)
+                result_queue.put((hash_value, file_infos))
             
         except Exception as e:
             error_msg = f"Error during search: {str(e)}"
-            self.root.after(0, lambda: self.update_progress(0, error_msg))
-            self.root.after(0, lambda: messagebox.showerror("Search Error", error_msg))
+            self._call_on_ui(self.update_progress, 0, error_msg)
+            self._call_on_ui(messagebox.showerror, "Search Error", error_msg)
         finally:
-            self.root.after(0, self.reset_ui_state)
+            result_queue.put(None)
+    
+    def _on_search_done(self, future: Future):
+        """Reset the UI once the latest search has finished."""
+        if future is self._search_future:
+            self.reset_ui_state()
     
-    def display_results(self):
-        """Display the search results in the treeview."""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def display_results(self, result_queue: queue.Queue):
+        """
+        Display search results in the treeview as they arrive.
         
-        self.file_selections.clear()
-        self.duplicate_groups.clear()
+        Groups are taken from the queue in chunks on the UI thread so the
+        window stays responsive while large result sets render.
         
-        if not self.duplicates:
-            self.results_info.config(text="No duplicates found")
-            return
+        Args:
+            result_queue: Queue of (hash, files) groups ending with None
+        """
+        self.cancel_rendering()
         
-        total_files = 0
-        group_count = 0
+        # Clear existing items; deleting the groups removes their rows too
+        self.clear_tree()
         
-        for hash_value, files in self.duplicates.items():
-            group_count += 1
-            total_files += len(files)
+        self.clear_selection_state()
+        self.duplicate_groups.clear()
+        
+        self._result_queue = result_queue
+        self._render_total = 0
+        self._render_base = None  # Search root, read once the first group arrives
+        self._render_job = self.root.after(self.PROGRESS_POLL_MS, self._render_chunk)
+    
+    def _render_chunk(self):
+        """Insert the next chunk of queued groups, then reschedule until the search ends."""
+        rows = 0
+        while rows < self.RENDER_CHUNK_ROWS:
+            try:
+                group = self._result_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if group is None:
+                self._finish_rendering()
+                return
             
-            # Create group header
-            group_name = f"Group {group_count} ({len(files)} files)"
-            group_item = self.tree.insert('', 'end', text=group_name, values=('', '', '', ''))
+            hash_value, files = group
+            self._render_group(hash_value, files)
+            rows += len(files)
+            self._render_total += len(files)
+        
+        if rows:
+            self.results_info.config(text=f"Found {len(self.duplicate_groups)} duplicate groups so far…")
+        
+        # Keep going at idle time while groups are backed up, otherwise wait for more
+        if rows >= self.RENDER_CHUNK_ROWS:
+            self._render_job = self.root.after_idle(self._render_chunk)
+        else:
+            self._render_job = self.root.after(self.PROGRESS_POLL_MS, self._render_chunk)
+    
+    def _render_group(self, hash_value: str, group_infos: List[Dict]):
+        """Insert one duplicate group and its files, given their file infos, into the treeview."""
+        # Detector paths all start with the resolved search root, which is
+        # set before any group is yielded
+        if self._render_base is None:
+            self._render_base = self.detector.normalized_root or self.selected_folder.get()
+        base = self._render_base
+        base_prefix = base.rstrip(os.sep) + os.sep
+        group_count = len(self.duplicate_groups) + 1
+        
+        # Build the group's rows; selection state is tracked by path, so files
+        # can be selected before their rows exist in the tree
+        # Large result sets insert a group's file rows only once it is opened
+        eager = self._populated_rows < self.EAGER_ROWS
+        group_name = f"Group {group_count} ({len(group_infos)} files)"
+        group_item = self.tree.insert('', 'end', text=group_name, values=('', '', ''), open=eager)
+        self.group_selected_count[group_item] = 0
+        
+        file_infos = {}
+        rows = []
+        for file_info in group_infos:
+            file_path = file_info['path']
+            if file_path.startswith(base_prefix):
+                relative_path = file_path[len(base_prefix):]
+            else:
+                relative_path = os.path.relpath(file_path, base)
+            size_str = self.file_manager.format_file_size(file_info['size'])
+            file_info['size_str'] = size_str
+            file_infos[file_path] = file_info
             
-            # Add files to group
-            for i, file_path in enumerate(files):
-                file_info = self.file_manager.get_file_info(file_path)
-                if file_info:
-                    relative_path = self.file_manager.get_relative_path(file_path, self.selected_folder.get())
-                    size_str = self.file_manager.format_file_size(file_info['size'])
-                    
-                    # Default selection: nothing is selected initially
-                    is_selected = False
-                    self.file_selections[file_path] = is_selected
-                    
-                    # Insert file item with checkbox in Delete column
-                    checkbox_text = "☑" if is_selected else "☐"
-                    file_item = self.tree.insert(group_item, 'end', text=file_info['name'], 
-                                               values=(checkbox_text, size_str, relative_path, file_path))
-                    
-                    # Store file path in item for easy access
-                    self.tree.set(file_item, 'file_path', file_path)
+            self.all_files.add(file_path)
+            self.file_group[file_path] = group_item
+            rows.append((file_path, file_info['name'], (size_str, relative_path)))
+        self._group_paths[group_item] = list(file_infos)
+        
+        if eager:
+            # Detached while its files are added so the tree is not re-laid out on every insert
+            self.tree.detach(group_item)
+            self._insert_rows(group_item, rows)
+            self.tree.reattach(group_item, '', 'end')
+        else:
+            # The placeholder child gives the group an expand arrow
+            self.tree.insert(group_item, 'end', text="Loading…")
+            self._unpopulated[group_item] = rows
+        
+        # Store group information
+        self.duplicate_groups.append({
+            'hash': hash_value,
+            'files': list(file_infos),
+            'file_infos': file_infos,  # file_path -> info with precomputed 'size_str'
+            'tree_item': group_item
+        })
+    
+    def _insert_rows(self, group_item, rows: List[tuple]):
+        """
+        Insert file rows under a group, showing their current selection.
+        
+        Args:
+            group_item: Tree item of the group
+            rows: (file_path, name, item_cols) tuples in display order
+        """
+        selected_paths = self.selected_paths
+        for file_path, name, item_cols in rows:
+            if file_path not in self.all_files:
+                continue  # Deleted before its row was shown
             
-            # Store group information
-            self.duplicate_groups.append({
-                'hash': hash_value,
-                'files': files,
-                'tree_item': group_item
-            })
+            # Insert file item with checkbox in Delete column
+            file_item = self.tree.insert(group_item, 'end', text=name,
+                                         values=(self._CHK[file_path in selected_paths],) + item_cols)
+            self._item_to_path[file_item] = file_path
+            self._path_to_item[file_path] = file_item
+            self._item_cols[file_item] = item_cols
+            self._populated_rows += 1
+    
+    def on_group_open(self, event):
+        """Insert a group's file rows the first time it is expanded."""
+        group_item = self.tree.focus()
+        rows = self._unpopulated.pop(group_item, None)
+        if rows is None:
+            return
+        
+        # Replace the placeholder with the real rows
+        self.tree.delete(*self.tree.get_children(group_item))
+        self._insert_rows(group_item, rows)
+    
+    def _finish_rendering(self):
+        """Show the final result summary and enable the action buttons."""
+        self._render_job = None
+        self._result_queue = None
         
-        # Expand all groups
-        for item in self.tree.get_children():
-            self.tree.item(item, open=True)
+        if not self.duplicate_groups:
+            self.results_info.config(text="No duplicates found")
+            return
         
         # Update results info
-        self.results_info.config(text=f"Found {group_count} duplicate groups with {total_files} files")
+        self.results_info.config(
+            text=f"Found {len(self.duplicate_groups)} duplicate groups with {self._render_total} files")
         
         # Enable action buttons
-        self.select_all_button.config(state=tk.NORMAL)
-        self.deselect_all_button.config(state=tk.NORMAL)
-        self.auto_select_button.config(state=tk.NORMAL)
-        self.delete_button.config(state=tk.NORMAL)
-        self.clear_button.config(state=tk.NORMAL)
+        self.set_action_buttons_state(tk.NORMAL)
+    
+    def set_action_buttons_state(self, state):
+        """Enable or disable the buttons acting on the results."""
+        self.select_all_button.config(state=state)
+        self.deselect_all_button.config(state=state)
+        self.auto_select_button.config(state=state)
+        self.delete_button.config(state=state)
+        self.clear_button.config(state=state)
+    
+    def cancel_rendering(self):
+        """Stop inserting result rows if a render is in progress."""
+        if self._render_job is not None:
+            self.root.after_cancel(self._render_job)
+            self._render_job = None
+        self._result_queue = None
     
     def on_item_click(self, event):
         """Handle item click to toggle checkbox."""
@@ -336,24 +517,27 @@ class DuplicateFileDeleterApp:
         if not item:
             return
         
+        # Clicks on a group's expand arrow only open or close it
+        if 'indicator' in self.tree.identify_element(event.x, event.y):
+            return
+        
         # Get the column that was clicked
         column = self.tree.identify_column(event.x)
         
         # Check if it's a file item (has file_path)
         try:
-            file_path = self.tree.set(item, 'file_path')
-            if file_path and file_path in self.file_selections:
+            file_path = self._item_to_path.get(item)
+            if file_path in self.all_files:
                 # Toggle checkbox (works for any column click on file)
-                current_selection = self.file_selections[file_path]
-                new_selection = not current_selection
-                self.file_selections[file_path] = new_selection
+                new_selection = file_path not in self.selected_paths
+                self.set_file_selected(file_path, new_selection)
                 
                 # Update display
                 self.update_file_display(item, file_path, new_selection)
                 self.update_group_display_for_file(item)
                 
-            # Check if it's a group item (no file_path)
-            elif not file_path:
+            # Check if it's a group item
+            elif item in self.group_selected_count:
                 # Handle group selection
                 self.toggle_group_selection(item)
         except tk.TclError:
@@ -362,73 +546,61 @@ class DuplicateFileDeleterApp:
     def update_file_display(self, item, file_path, is_selected):
         """Update the display of a file item with checkbox."""
         # Update checkbox in Delete column
-        checkbox_text = "☑" if is_selected else "☐"
-        self.tree.set(item, 'Delete', checkbox_text)
+        # Rewriting the whole row is a single Tcl call, unlike tree.set
+        checkbox_text = self._CHK[is_selected]
+        self.tree.item(item, values=(checkbox_text,) + self._item_cols[item])
     
     def update_group_display_for_file(self, file_item):
         """Update group display when a file selection changes."""
         # Find the parent group
-        parent = self.tree.parent(file_item)
+        parent = self.file_group.get(self._item_to_path.get(file_item))
         if parent:
             self.update_group_display(parent)
     
     def toggle_group_selection(self, group_item):
         """Toggle selection for all files in a group (except first one)."""
-        children = self.tree.get_children(group_item)
-        if not children:
+        files = self._group_paths.get(group_item)
+        if not files:
             return
         
         # Check current state of group - if any file is selected, deselect all
         # If none are selected, select all except first
-        any_selected = False
-        for child in children:
-            try:
-                file_path = self.tree.set(child, 'file_path')
-                if file_path in self.file_selections and self.file_selections[file_path]:
-                    any_selected = True
-                    break
-            except tk.TclError:
-                continue
+        any_selected = self.group_selected_count.get(group_item, 0) > 0
         
-        # Toggle group selection
-        for i, child in enumerate(children):
-            try:
-                file_path = self.tree.set(child, 'file_path')
-                if file_path in self.file_selections:
-                    if any_selected:
-                        # Deselect all
-                        self.file_selections[file_path] = False
-                    else:
-                        # Select all except first
-                        self.file_selections[file_path] = i > 0
-                    
-                    self.update_file_display(child, file_path, self.file_selections[file_path])
-            except tk.TclError:
-                continue
+        # Deselect all, or select all except first
+        changed = self._apply_keep_first(files, select_rest=not any_selected)
+        self.refresh_tree_display(changed)
+    
+    def _apply_keep_first(self, file_paths: List[str], select_rest: bool = True) -> List[str]:
+        """
+        Keep the first file unselected and select (or deselect) the rest.
         
-        # Update group checkbox
-        self.update_group_display(group_item)
+        Args:
+            file_paths: Files of one group in display order
+            select_rest: Whether files after the first are selected
+            
+        Returns:
+            Paths whose selection state changed
+        """
+        changed = []
+        for i, file_path in enumerate(file_paths):
+            is_selected = select_rest and i > 0
+            if is_selected != (file_path in self.selected_paths):
+                self.set_file_selected(file_path, is_selected)
+                changed.append(file_path)
+        return changed
     
     def update_group_display(self, group_item):
         """Update the display of a group item with checkbox."""
-        children = self.tree.get_children(group_item)
-        if not children:
+        if group_item not in self.group_selected_count:
             return
         
         # Check if any files are selected
-        any_selected = False
-        for child in children:
-            try:
-                file_path = self.tree.set(child, 'file_path')
-                if file_path in self.file_selections and self.file_selections[file_path]:
-                    any_selected = True
-                    break
-            except tk.TclError:
-                continue
+        any_selected = self.group_selected_count[group_item] > 0
         
         # Update group checkbox in Delete column
-        checkbox_text = "☑" if any_selected else "☐"
-        self.tree.set(group_item, 'Delete', checkbox_text)
+        checkbox_text = self._CHK[any_selected]
+        self.tree.item(group_item, values=(checkbox_text, '', ''))
     
     def on_item_double_click(self, event):
         """Handle item double-click to open file location."""
@@ -437,56 +609,105 @@ class DuplicateFileDeleterApp:
             return
         
         try:
-            file_path = self.tree.set(item, 'file_path')
+            file_path = self._item_to_path.get(item)
             if file_path and os.path.exists(file_path):
                 # Open file location in system file manager
                 system = platform.system()
                 if system == "Darwin":  # macOS
-                    subprocess.run(["open", "-R", file_path])
+                    command = ["open", "-R", file_path]
                 elif system == "Windows":
-                    subprocess.run(["explorer", "/select,", file_path])
+                    command = ["explorer", "/select,", file_path]
                 else:  # Linux and others
-                    subprocess.run(["xdg-open", os.path.dirname(file_path)])
-        except (tk.TclError, subprocess.SubprocessError):
+                    command = ["xdg-open", os.path.dirname(file_path)]
+                
+                # Launch without waiting; the file manager can take a while to start
+                subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                 start_new_session=(system != "Windows"))
+        except (tk.TclError, OSError, subprocess.SubprocessError):
             pass
     
+    def set_file_selected(self, file_path: str, is_selected: bool):
+        """Select or deselect a file, keeping its group's selected count in sync."""
+        if is_selected == (file_path in self.selected_paths):
+            return
+        
+        group_item = self.file_group[file_path]
+        if is_selected:
+            self.selected_paths.add(file_path)
+            self.group_selected_count[group_item] += 1
+        else:
+            self.selected_paths.discard(file_path)
+            self.group_selected_count[group_item] -= 1
+    
+    def clear_tree(self):
+        """Remove every group from the tree in a single Tcl call."""
+        # Every group in the tree has a selection count, so no tree walk is needed
+        if self.group_selected_count:
+            self.tree.delete(*self.group_selected_count)
+    
+    def clear_selection_state(self):
+        """Forget all displayed files and selections."""
+        self.all_files.clear()
+        self.selected_paths.clear()
+        self.file_group.clear()
+        self.group_selected_count.clear()
+        self._item_to_path.clear()
+        self._path_to_item.clear()
+        self._item_cols.clear()
+        self._group_paths.clear()
+        self._unpopulated.clear()
+        self._populated_rows = 0
+    
     def select_all(self):
         """Select all files for deletion."""
-        for file_path in self.file_selections:
-            self.file_selections[file_path] = True
-        self.refresh_tree_display()
+        changed = list(self.all_files - self.selected_paths)
+        for file_path in changed:
+            self.set_file_selected(file_path, True)
+        self.refresh_tree_display(changed)
     
     def deselect_all(self):
         """Deselect all files."""
-        for file_path in self.file_selections:
-            self.file_selections[file_path] = False
-        self.refresh_tree_display()
+        changed = list(self.selected_paths)
+        for file_path in changed:
+            self.set_file_selected(file_path, False)
+        self.refresh_tree_display(changed)
     
     def auto_select(self):
         """Auto-select: select all files except the first one in each group."""
+        changed = []
         for group in self.duplicate_groups:
-            files = group['files']
-            for i, file_path in enumerate(files):
-                self.file_selections[file_path] = i > 0  # True for all except first
-        self.refresh_tree_display()
-    
-    def refresh_tree_display(self):
-        """Refresh the checkbox display in the tree view."""
-        for group_item in self.tree.get_children():
-            for child in self.tree.get_children(group_item):
-                try:
-                    file_path = self.tree.set(child, 'file_path')
-                    if file_path in self.file_selections:
-                        self.update_file_display(child, file_path, self.file_selections[file_path])
-                except tk.TclError:
-                    pass
-            
-            # Update group display
+            files = [file_path for file_path in group['files'] if file_path in self.all_files]
+            changed.extend(self._apply_keep_first(files))
+        self.refresh_tree_display(changed)
+    
+    def refresh_tree_display(self, file_paths: List[str]):
+        """
+        Refresh the checkbox display of changed files and their groups.
+        
+        Args:
+            file_paths: Files whose selection state changed
+        """
+        selected_paths = self.selected_paths
+        item_cols = self._item_cols
+        chk = self._CHK
+        groups = set()
+        for file_path in file_paths:
+            groups.add(self.file_group[file_path])
+            item = self._path_to_item.get(file_path)
+            if item is None:
+                continue  # Row not inserted yet; it is drawn from the selection when its group opens
+            try:
+                self.tree.item(item, values=(chk[file_path in selected_paths],) + item_cols[item])
+            except tk.TclError:
+                pass
+        
+        # Update group display
+        for group_item in groups:
             self.update_group_display(group_item)
     
     def delete_selected(self):
         """Delete selected files after confirmation."""
-        files_to_delete = [path for path, is_selected in self.file_selections.items() if is_selected]
+        files_to_delete = list(self.selected_paths)
         
         if not files_to_delete:
             messagebox.showinfo("No Files Selected", "No files are selected for deletion.")
@@ -497,9 +718,30 @@ class DuplicateFileDeleterApp:
         if not messagebox.askyesno("Confirm Deletion", message):
             return
         
-        # Delete files
+        # Delete files on the worker thread; searches wait for it to finish
+        self.set_action_buttons_state(tk.DISABLED)
+        self.set_search_controls_state(tk.DISABLED)
+        self.update_progress(0, f"Moving {len(files_to_delete)} files to trash...")
         self.file_manager.clear_errors()
-        results = self.file_manager.move_files_to_trash(files_to_delete)
+        
+        def report(done, total):
+            self.update_progress(done / total * 100, f"Moved {done} of {total} files to trash")
+        
+        future = self._executor.submit(self.file_manager.move_files_to_trash, files_to_delete, report)
+        future.add_done_callback(lambda future: self._call_on_ui(self._finish_delete, future))
+    
+    def _finish_delete(self, future: Future):
+        """Report the outcome of a deletion and update the display."""
+        # Controls are left to the search if one was queued behind the deletion
+        if self._search_future is None or self._search_future.done():
+            self.reset_ui_state()
+            self.set_action_buttons_state(tk.NORMAL)
+        
+        try:
+            results = future.result()
+        except Exception as e:
+            messagebox.showerror("Delete Error", f"Error while moving files to trash: {str(e)}")
+            return
         
         # Show results
         success_count = sum(1 for success in results.values() if success)
@@ -512,76 +754,150 @@ class DuplicateFileDeleterApp:
             error_msg += "\n".join(self.file_manager.get_errors()[:5])  # Show first 5 errors
             messagebox.showwarning("Partial Success", error_msg)
         
-        # Remove deleted files from display
-        self.remove_deleted_files_from_display(files_to_delete)
+        # Remove deleted files from display; files that failed stay listed
+        self.remove_deleted_files_from_display([file_path for file_path, success in results.items() if success])
     
     def remove_deleted_files_from_display(self, deleted_files: List[str]):
         """Remove deleted files from the tree display."""
-        for group_item in self.tree.get_children():
-            children_to_remove = []
-            for child in self.tree.get_children(group_item):
-                try:
-                    file_path = self.tree.set(child, 'file_path')
-                    if file_path in deleted_files:
-                        children_to_remove.append(child)
-                except tk.TclError:
-                    pass
+        affected_groups = set()
+        
+        for file_path in deleted_files:
+            if file_path not in self.all_files:
+                continue
             
-            # Remove children
-            for child in children_to_remove:
-                self.tree.delete(child)
-                
-            # Remove group if no children left
-            if not self.tree.get_children(group_item):
+            # Update file selections first so group counts are correct when redrawn
+            self.set_file_selected(file_path, False)
+            self.all_files.discard(file_path)
+            affected_groups.add(self.file_group.pop(file_path))
+            
+            # Remove the file row if its group has been populated
+            item = self._path_to_item.pop(file_path, None)
+            if item is None:
+                continue
+            del self._item_to_path[item]
+            del self._item_cols[item]
+            try:
+                self.tree.delete(item)
+            except tk.TclError:
+                pass
+        
+        for group_item in affected_groups:
+            remaining = [file_path for file_path in self._group_paths[group_item] if file_path in self.all_files]
+            self._group_paths[group_item] = remaining
+            
+            # Remove group if no files left
+            if not remaining:
                 self.tree.delete(group_item)
+                self.group_selected_count.pop(group_item, None)
+                self._group_paths.pop(group_item, None)
+                self._unpopulated.pop(group_item, None)
             else:
                 # Update group display after removing files
                 self.update_group_display(group_item)
-        
-        # Update file selections
-        for file_path in deleted_files:
-            self.file_selections.pop(file_path, None)
     
     def clear_results(self):
         """Clear all results and reset the UI."""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.cancel_rendering()
+        self.clear_tree()
         
-        self.duplicates.clear()
         self.duplicate_groups.clear()
-        self.file_selections.clear()
+        self.clear_selection_state()
         
         self.results_info.config(text="No duplicates found yet")
+        
+        # Discard progress still queued from a previous search
+        while not self._progress_queue.empty():
+            try:
+                self._progress_queue.get_nowait()
+            except queue.Empty:
+                break
+        
         self.progress_bar['value'] = 0
         self.progress_label.config(text="Ready to search")
+        self.progress_text.config(state=tk.NORMAL)
         self.progress_text.delete(1.0, tk.END)
+        self.progress_text.config(state=tk.DISABLED)
         
         # Disable action buttons
-        self.select_all_button.config(state=tk.DISABLED)
-        self.deselect_all_button.config(state=tk.DISABLED)
-        self.auto_select_button.config(state=tk.DISABLED)
-        self.delete_button.config(state=tk.DISABLED)
-        self.clear_button.config(state=tk.DISABLED)
+        self.set_action_buttons_state(tk.DISABLED)
     
     def update_progress(self, progress: float, message: str):
-        """Update the progress bar and message."""
-        self.progress_bar['value'] = progress
-        self.progress_label.config(text=f"{progress:.1f}%")
+        """
+        Queue a progress update.
         
-        # Add message to progress text
+        Safe to call from the search thread; no Tk calls are made here.
+        """
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.progress_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.progress_text.see(tk.END)
-        
-        # Update display
-        self.root.update_idletasks()
+        self._progress_queue.put((progress, f"[{timestamp}] {message}\n"))
+    
+    def _drain_progress(self):
+        """Apply all queued progress updates in one widget update."""
+        latest_progress = None
+        lines = deque(maxlen=self.MAX_PROGRESS_LINES)  # Older lines would be trimmed right away
+        while True:
+            try:
+                latest_progress, line = self._progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            lines.append(line)
+        
+        if lines:
+            self.progress_bar['value'] = latest_progress
+            self.progress_label.config(text=f"{latest_progress:.1f}%")
+            
+            # Add messages to progress text, keeping only the most recent lines
+            self.progress_text.config(state=tk.NORMAL)
+            self.progress_text.insert(tk.END, "".join(lines))
+            line_count = int(self.progress_text.index('end-1c').split('.')[0])
+            if line_count > self.MAX_PROGRESS_LINES:
+                self.progress_text.delete('1.0', f'{line_count - self.MAX_PROGRESS_LINES}.0')
+            self.progress_text.config(state=tk.DISABLED)
+            self.progress_text.see(tk.END)
+        
+        self.root.after(self.PROGRESS_POLL_MS, self._drain_progress)
+    
+    def set_search_controls_state(self, state):
+        """Enable or disable the controls that start a search or change its settings."""
+        self.search_button.config(state=state)
+        self.quick_rescan_button.config(state=state)
+        self.browse_button.config(state=state)
+        self.clear_cache_button.config(state=state)
+        self.verify_check.config(state=state)
     
     def reset_ui_state(self):
         """Reset UI state after search completion."""
         self.is_searching = False
-        self.search_button.config(state=tk.NORMAL)
+        self.set_search_controls_state(tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
-        self.browse_button.config(state=tk.NORMAL)
+    
+    def clear_cache(self):
+        """Forget hashes saved by earlier searches."""
+        if self.hash_cache.clear():
+            messagebox.showinfo("Cache Cleared", "Saved file hashes were removed. The next search will read every file again.")
+        else:
+            messagebox.showerror("Error", f"Could not remove the hash cache at {self.hash_cache.db_path}.")
+    
+    def _call_on_ui(self, callback, *args):
+        """Schedule a callback on the Tk thread from a worker, unless the window is closed."""
+        if self._closed:
+            return
+        try:
+            self.root.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            pass  # The window was destroyed in the meantime
+    
+    def on_close(self):
+        """Cancel any running search and close the window."""
+        self._closed = True
+        self.stop_search()
+        self.folder_watcher.stop()
+        try:
+            # Drop queued work so interpreter exit only waits for the task already running
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        except TypeError:
+            # cancel_futures needs Python 3.9
+            self._executor.shutdown(wait=False)
+        self.root.destroy()
 
 
 def main():
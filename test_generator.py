@@ -7,17 +7,79 @@ Creates a test folder with duplicate files to test the application.
 import os
 import shutil
 import random
-import string
 from pathlib import Path
 
 
-def generate_random_content(size: int) -> str:
-    """Generate random content of specified size."""
-    return ''.join(random.choices(string.ascii_letters + string.digits + ' \n', k=size))
+# Seed used by --deterministic so generated trees can be reproduced
+DETERMINISTIC_SEED = 0
 
+# Bytes drawn per getrandbits call when generating deterministic content
+RANDOM_CHUNK_SIZE = 1 << 20
 
-def create_test_structure():
-    """Create test directory structure with duplicate files."""
+
+def generate_random_content(size: int, deterministic: bool = False) -> bytes:
+    """
+    Generate random content of specified size.
+    
+    Args:
+        size: Number of bytes to generate
+        deterministic: Draw from the seeded random module instead of os.urandom
+        
+    Returns:
+        Random bytes of the requested size
+    """
+    if deterministic:
+        # getrandbits takes a C int bit count, so draw the content in bounded chunks
+        chunks = []
+        for offset in range(0, size, RANDOM_CHUNK_SIZE):
+            chunk_size = min(RANDOM_CHUNK_SIZE, size - offset)
+            chunks.append(random.getrandbits(chunk_size * 8).to_bytes(chunk_size, "little"))
+        return b"".join(chunks)
+    return os.urandom(size)
+
+
+def write_file(file_path: Path, content, is_binary: bool = False):
+    """Write text or binary content to a file."""
+    mode = 'wb' if is_binary else 'w'
+    encoding = None if is_binary else 'utf-8'
+    
+    with open(file_path, mode, encoding=encoding) as f:
+        f.write(content)
+
+
+def create_stress_files(folder: Path, size_mb: int, deterministic: bool = False):
+    """
+    Create large random files for timing the hashing stage.
+    
+    Two copies share the same content; a third file differs from them only
+    in its middle byte, so only a full content comparison tells it apart.
+    
+    Args:
+        folder: Folder to create the files in
+        size_mb: Size of each file in MiB
+        deterministic: Generate the content from the seeded random module
+    """
+    folder.mkdir(parents=True, exist_ok=True)
+    content = generate_random_content(size_mb << 20, deterministic)
+    write_file(folder / "large.bin", content, is_binary=True)
+    write_file(folder / "large_copy.bin", content, is_binary=True)
+    
+    near_miss = bytearray(content)
+    near_miss[len(near_miss) // 2] ^= 0xFF
+    write_file(folder / "large_near_miss.bin", near_miss, is_binary=True)
+
+
+def create_test_structure(link_duplicates: bool = False, stress_size_mb: int = 0, deterministic: bool = False):
+    """
+    Create test directory structure with duplicate files.
+    
+    Args:
+        link_duplicates: Hard link repeated copies to the first one instead of
+            writing the same bytes again. The detector then sees shared inodes
+            rather than independent copies whose content must be compared.
+        stress_size_mb: Size in MiB of large files created under stress/; 0 skips them
+        deterministic: Generate stress file content from the seeded random module
+    """
     
     # Test folder path
     test_folder = Path("test_duplicates")
@@ -133,6 +195,7 @@ Charlie,32,Seattle""",
     for file_info in test_files:
         content = file_info["content"]
         is_binary = file_info.get("binary", False)
+        first_path = None
         
         for location in file_info["locations"]:
             file_path = test_folder / location / file_info["name"]
@@ -149,12 +212,17 @@ Charlie,32,Seattle""",
                         new_name = f"{base_name}{suffix}.{ext}"
                         file_path = test_folder / location / new_name
             
-            # Write file
-            mode = 'wb' if is_binary else 'w'
-            encoding = None if is_binary else 'utf-8'
+            # Write the content once, then hard link the other copies to it
+            if first_path is not None and link_duplicates:
+                try:
+                    os.link(first_path, file_path)
+                    continue
+                except OSError:
+                    pass  # Links not supported here, write a real copy instead
             
-            with open(file_path, mode, encoding=encoding) as f:
-                f.write(content)
+            write_file(file_path, content, is_binary)
+            if first_path is None:
+                first_path = file_path
     
     # Create some unique files (no duplicates)
     unique_files = [
@@ -191,6 +259,9 @@ Charlie,32,Seattle""",
         file_path = test_folder / empty_file
         file_path.touch()
     
+    if stress_size_mb > 0:
+        create_stress_files(test_folder / "stress", stress_size_mb, deterministic)
+    
     print(f"✅ Test structure created successfully in '{test_folder}'")
     print("\nTest structure includes:")
     print("- Multiple duplicate files with same content")
@@ -217,21 +288,29 @@ def print_test_summary():
     total_files = 0
     total_size = 0
     
-    for root, dirs, files in os.walk(test_folder):
-        level = root.replace(str(test_folder), '').count(os.sep)
+    # Walk depth first with an explicit stack; scandir entries carry cached stat data
+    stack = [(str(test_folder), 0)]
+    while stack:
+        directory, level = stack.pop()
         indent = ' ' * 2 * level
-        print(f"{indent}{os.path.basename(root)}/")
+        print(f"{indent}{os.path.basename(directory)}/")
         
         subindent = ' ' * 2 * (level + 1)
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_size = os.path.getsize(file_path)
-            total_files += 1
-            total_size += file_size
-            
-            # Mark hidden files
-            hidden_mark = " (hidden)" if file.startswith('.') else ""
-            print(f"{subindent}{file} ({file_size} bytes){hidden_mark}")
+        subdirs = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    file_size = entry.stat().st_size
+                    total_files += 1
+                    total_size += file_size
+                    
+                    # Mark hidden files
+                    hidden_mark = " (hidden)" if entry.name.startswith('.') else ""
+                    print(f"{subindent}{entry.name} ({file_size} bytes){hidden_mark}")
+        
+        stack.extend((subdir, level + 1) for subdir in reversed(subdirs))
     
     print(f"\n📊 Summary:")
     print(f"Total files: {total_files}")
@@ -242,10 +321,23 @@ def print_test_summary():
 if __name__ == "__main__":
     import sys
     
+    deterministic = "--deterministic" in sys.argv
+    if deterministic:
+        random.seed(DETERMINISTIC_SEED)
+    
+    stress_size_mb = 0
+    if "--stress" in sys.argv:
+        index = sys.argv.index("--stress") + 1
+        if index >= len(sys.argv) or not sys.argv[index].isdigit() or int(sys.argv[index]) == 0:
+            print("❌ Usage: python3 test_generator.py --stress SIZE_MB (a positive whole number of MiB)")
+            sys.exit(2)
+        stress_size_mb = int(sys.argv[index])
+    
     if len(sys.argv) > 1 and sys.argv[1] == "--summary":
         print_test_summary()
     else:
         print("🔧 Creating test structure for Duplicate File Deleter...")
-        create_test_structure()
+        create_test_structure(link_duplicates="--link" in sys.argv, stress_size_mb=stress_size_mb,
+                              deterministic=deterministic)
         print("\n" + "="*50)
         print_test_summary() 
\ No newline at end of file